@@ -1,7 +1,16 @@
 """Macro regime detection preprocessing pipeline."""
 from macrostate.config.settings import PreprocessConfig
-from macrostate.pipelines.preprocess import build_preprocessing_pipeline
 
 __version__ = "0.1.6"
 __all__ = ["PreprocessConfig", "build_preprocessing_pipeline"]
 
+
+def __getattr__(name: str):
+    # Deferred so that importing the package (e.g. for the CLI) does not pull
+    # in sklearn and compile the numba kernels
+    if name == "build_preprocessing_pipeline":
+        from macrostate.pipelines.preprocess import build_preprocessing_pipeline
+
+        return build_preprocessing_pipeline
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
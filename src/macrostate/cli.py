@@ -1,25 +1,20 @@
+import dataclasses
+import hashlib
 from pathlib import Path
 from typing import Annotated
 
 import typer
 from rich.console import Console
-from rich.table import Table
 
 from macrostate.config.settings import PreprocessConfig
-from macrostate.data.io import (
-    load_raw_data,
-    clean_dataframe,
-    save_parquet,
-    generate_data_quality_report,
-)
-from macrostate.data.validation import validate_dataframe, check_monthly_frequency
-from macrostate.pipelines.preprocess import build_preprocessing_pipeline, AVAILABLE_RECIPES
-from macrostate.utils.logging import get_logger
+from macrostate.recipes import AVAILABLE_RECIPES
 from macrostate.utils.paths import get_project_root
 
+# Heavy modules (pandas, sklearn, numba kernels, data I/O) are imported inside
+# the commands that need them so that e.g. `list-recipes` starts fast.
+
 app = typer.Typer(name="macrostate", help="Macro regime detection preprocessing CLI")
 console = Console()
-logger = get_logger("cli")
 
 
 @app.command()
@@ -40,17 +35,37 @@ def preprocess(
         Path,
         typer.Option("--output-dir", "-o", help="Output directory for features"),
     ] = None,
+    use_cache: Annotated[
+        bool,
+        typer.Option(
+            "--cache/--no-cache",
+            help=(
+                "Reuse features cached for unchanged input, config and package code "
+                "(a cache hit skips validation and the cleaned-data write)"
+            ),
+        ),
+    ] = True,
 ) -> None:
     """Run preprocessing pipeline on macro data."""
-    root = get_project_root()
+    import pandas as pd
+
+    from macrostate.data.io import (
+        load_raw_data,
+        clean_dataframe,
+        save_parquet,
+        generate_data_quality_report,
+    )
+    from macrostate.data.validation import validate_dataframe, check_monthly_frequency
+    from macrostate.pipelines.preprocess import build_preprocessing_pipeline
+
     cfg = PreprocessConfig()
 
     if input_path is None:
-        input_path = root / cfg.raw_data_path
+        input_path = cfg.raw_data_path
     if output_dir:
-        cfg.features_dir = output_dir
+        cfg = dataclasses.replace(cfg, features_dir=get_project_root() / output_dir)
     if asof:
-        cfg.asof_date = asof
+        cfg = dataclasses.replace(cfg, asof_date=asof)
 
     if recipe not in AVAILABLE_RECIPES:
         console.print(f"[red]Error: Unknown recipe '{recipe}'[/red]")
@@ -61,38 +76,112 @@ def preprocess(
     console.print(f"Recipe: [green]{recipe}[/green]")
     console.print(f"Input: {input_path}")
 
-    # Load and validate
-    df_raw = load_raw_data(input_path, cfg)
-    validate_dataframe(df_raw, cfg)
-    warnings = check_monthly_frequency(df_raw)
-    for w in warnings:
-        console.print(f"[yellow]Warning: {w}[/yellow]")
+    cache_path = _features_cache_path(cfg.cache_dir, input_path, recipe, cfg) if use_cache else None
+
+    if cache_path is not None and cache_path.exists():
+        console.print(f"[green]Using cached features:[/green] {cache_path}")
+        console.print(
+            "[yellow]Validation and cleaned-data write skipped (use --no-cache to rerun)[/yellow]"
+        )
+        df_features = _load_cached_features(cache_path)
+    else:
+        # Load and validate
+        df_raw = load_raw_data(input_path, cfg)
+        validate_dataframe(df_raw, cfg)
+        warnings = check_monthly_frequency(df_raw)
+        for w in warnings:
+            console.print(f"[yellow]Warning: {w}[/yellow]")
 
-    # Clean
-    df_clean = clean_dataframe(df_raw, cfg)
+        # Clean
+        df_clean = clean_dataframe(df_raw, cfg)
 
-    # Save cleaned data
-    cleaned_path = root / cfg.cleaned_parquet_path
-    save_parquet(df_clean, cleaned_path)
+        # Save cleaned data
+        save_parquet(df_clean, cfg.cleaned_parquet_path)
 
-    # Build and run pipeline
-    pipeline = build_preprocessing_pipeline(recipe, cfg)
-    df_features = pipeline.fit_transform(df_clean)
+        # Build and run pipeline
+        memory = cfg.cache_dir / "steps" if use_cache else None
+        run_pipeline = build_preprocessing_pipeline(recipe, cfg, legacy=False, memory=memory)
+        df_features = run_pipeline(df_clean)
+        if cache_path is not None:
+            _save_cached_features(df_features, cache_path)
 
     # Save features
-    features_path = root / cfg.get_features_path(recipe)
-    save_parquet(df_features, features_path)
+    save_parquet(df_features, cfg.get_features_path(recipe))
 
     # Generate quality report
-    report_path = root / cfg.reports_dir / "data_quality.json"
+    report_path = cfg.reports_dir / "data_quality.json"
     report = generate_data_quality_report(df_features, report_path)
 
     # Print summary
     _print_summary(df_features, recipe, report)
 
 
+def _features_cache_path(
+    cache_dir: Path, input_path: Path, recipe: str, cfg: PreprocessConfig
+) -> Path:
+    """Cache file for a recipe's features.
+
+    Keyed on the input file's path, mtime and size (not its contents, which
+    would be slower to hash than to reprocess), recipe, config, and the
+    package version and source files so that upgrades invalidate it.
+    """
+    from macrostate import __version__
+
+    stat = input_path.stat()
+    key = (
+        f"{input_path}:{stat.st_mtime_ns}:{stat.st_size}:{recipe}:{cfg!r}"
+        f":{__version__}:{_code_fingerprint()}"
+    )
+    return cache_dir / f"{hashlib.blake2b(key.encode(), digest_size=16).hexdigest()}.parquet"
+
+
+_FREQ_KEY = b"macrostate.index_freq"
+
+
+def _save_cached_features(df, cache_path: Path) -> None:
+    """Write features to the cache; read back with `_load_cached_features`.
+
+    Parquet does not store a DatetimeIndex's `freq`, so it is kept in the
+    schema metadata to make a cache hit return the same frame as a miss.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(df)
+    freq = getattr(df.index, "freqstr", None)
+    if freq is not None:
+        table = table.replace_schema_metadata({**table.schema.metadata, _FREQ_KEY: freq})
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(table, cache_path)
+
+
+def _load_cached_features(cache_path: Path):
+    """Read features written by `_save_cached_features`."""
+    import pandas as pd
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(cache_path)
+    df = table.to_pandas()
+    freq = (table.schema.metadata or {}).get(_FREQ_KEY)
+    if freq is not None:
+        df.index = pd.DatetimeIndex(df.index, freq=freq.decode())
+    return df
+
+
+def _code_fingerprint() -> str:
+    """Size and mtime of every module in the package (stat only, no reads)."""
+    package_dir = Path(__file__).resolve().parent
+    parts = []
+    for path in sorted(package_dir.rglob("*.py")):
+        stat = path.stat()
+        parts.append(f"{path.relative_to(package_dir)}:{stat.st_size}:{stat.st_mtime_ns}")
+    return ";".join(parts)
+
+
 def _print_summary(df, recipe: str, report: dict) -> None:
     """Print summary table."""
+    from rich.table import Table
+
     table = Table(title="Preprocessing Summary")
     table.add_column("Metric", style="cyan")
     table.add_column("Value", style="green")
@@ -130,11 +219,13 @@ def validate(
     ] = None,
 ) -> None:
     """Validate raw data file without processing."""
-    root = get_project_root()
+    from macrostate.data.io import load_raw_data
+    from macrostate.data.validation import validate_dataframe, check_monthly_frequency
+
     cfg = PreprocessConfig()
 
     if input_path is None:
-        input_path = root / cfg.raw_data_path
+        input_path = cfg.raw_data_path
 
     console.print(f"[bold]Validating: {input_path}[/bold]")
 
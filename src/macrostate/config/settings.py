@@ -1,21 +1,30 @@
+from collections.abc import Mapping
 from dataclasses import dataclass, field
 from pathlib import Path
+from types import MappingProxyType
 from typing import Literal
 
+from macrostate.utils.paths import get_project_root
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class PreprocessConfig:
-    """Configuration for preprocessing pipeline."""
+    """Configuration for preprocessing pipeline.
+
+    Immutable and hashable so that pipelines can be cached per config; use
+    `dataclasses.replace` to derive a modified config.
+    """
 
-    # Data paths
+    # Data paths (relative paths are resolved against the project root)
     raw_data_path: Path = Path("data/raw/raw_dataset.xlsx")
     cleaned_parquet_path: Path = Path("data/cleaned/monthly.parquet")
     features_dir: Path = Path("data/features")
     reports_dir: Path = Path("reports")
+    cache_dir: Path = Path(".cache/macrostate")
 
     # Required columns in raw data
-    required_columns: list[str] = field(
-        default_factory=lambda: [
+    required_columns: tuple[str, ...] = field(
+        default_factory=lambda: (
             "Date",
             "US10Y",
             "US2Y",
@@ -28,18 +37,20 @@ class PreprocessConfig:
             "S&P500",
             "Credit Spread",
             "Confidence",
-        ]
+        )
     )
 
     # Column mapping for cleaner names
-    column_rename: dict[str, str] = field(
-        default_factory=lambda: {
+    # (read-only mapping, left out of the hash since it is not hashable)
+    column_rename: Mapping[str, str] = field(
+        default_factory=lambda: MappingProxyType({
             "Inflation (expectation)": "INFLATION_EXP",
             "PMI Gap": "PMI_GAP",
             "Volatilité": "VIX",
             "S&P500": "SPX_RET_1M",
             "Credit Spread": "CREDIT_SPREAD",
-        }
+        }),
+        hash=False,
     )
 
     # Cleaning parameters
@@ -51,8 +62,8 @@ class PreprocessConfig:
     zscore_min_periods: int = 24
 
     # Columns for z-score transformation (after renaming)
-    zscore_columns: list[str] = field(
-        default_factory=lambda: [
+    zscore_columns: tuple[str, ...] = field(
+        default_factory=lambda: (
             "US10Y",
             "US2Y",
             "HY_OAS",
@@ -64,12 +75,12 @@ class PreprocessConfig:
             "CREDIT_SPREAD",
             "Confidence",
             "YC_SLOPE",
-        ]
+        )
     )
 
     # Columns for diff transformation
-    diff_columns: list[str] = field(
-        default_factory=lambda: [
+    diff_columns: tuple[str, ...] = field(
+        default_factory=lambda: (
             "US10Y",
             "HY_OAS",
             "INFLATION_EXP",
@@ -77,21 +88,57 @@ class PreprocessConfig:
             "Unemployment",
             "VIX",
             "Confidence",
-        ]
+        )
     )
 
+    # Periods (months) for diff transformation
+    diff_periods: tuple[int, ...] = (1, 6)
+
     # Columns to flip sign (higher = worse)
-    sign_flip_columns: list[str] = field(
-        default_factory=lambda: ["Unemployment_Z"]
-    )
+    sign_flip_columns: tuple[str, ...] = ("Unemployment_Z",)
+
+    # Drop NaN rows by scanning the features instead of slicing off the known
+    # warm-up rows; only needed if the cleaned data can still contain NaNs
+    safe_dropna: bool = False
+
+    # Floating dtype for the feature pipeline (name rather than np.dtype so
+    # that importing the config stays cheap)
+    dtype: str = "float32"
 
     # Date filter
     asof_date: str | None = None
 
+    def __post_init__(self) -> None:
+        # Resolve once here rather than joining `root / path` at every call site
+        root = get_project_root()
+        for name in _PATH_FIELDS:
+            object.__setattr__(self, name, root / getattr(self, name))
+        # Accept lists/dicts from callers but store immutable, hashable values
+        for name in _TUPLE_FIELDS:
+            object.__setattr__(self, name, tuple(getattr(self, name)))
+        if not isinstance(self.column_rename, MappingProxyType):
+            object.__setattr__(self, "column_rename", MappingProxyType(dict(self.column_rename)))
+
     def get_features_path(self, recipe: str) -> Path:
         return self.features_dir / f"{recipe}.parquet"
 
 
+_PATH_FIELDS = (
+    "raw_data_path",
+    "cleaned_parquet_path",
+    "features_dir",
+    "reports_dir",
+    "cache_dir",
+)
+
+_TUPLE_FIELDS = (
+    "required_columns",
+    "zscore_columns",
+    "diff_columns",
+    "diff_periods",
+    "sign_flip_columns",
+)
+
 # Available recipes
 RecipeType = Literal["baseline_z", "z_plus_momentum", "changes_only", "levels_only"]
 
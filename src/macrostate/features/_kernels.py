@@ -0,0 +1,188 @@
+"""Numba kernels backing the feature transformers.
+
+All kernels are past-only: the statistic written at row i only depends on
+rows strictly before i, so they can be used without leakage.
+"""
+import math
+
+import numpy as np
+from numba import njit, prange
+
+# nnan/ninf are deliberately left out: windows routinely contain NaNs and
+# dropping the checks would silently corrupt the running sums.
+_FASTMATH = {"reassoc", "contract", "arcp"}
+
+
+@njit(cache=True, fastmath=_FASTMATH, nogil=True, error_model="numpy")
+def _zscore_1d(a, window, min_periods, out):
+    """Past-only rolling z-score of `a` written into `out`.
+
+    Uses an add/remove Welford update with float64 accumulators, which stays
+    stable when `a` is float32 (no s2 - s*s/n cancellation). Like pandas, a
+    window whose values are all equal has a mean of exactly that value and a
+    variance of exactly 0 (the updates would leave a tiny residual), so an
+    unchanged current value gives NaN rather than +/-inf.
+    """
+    n = 0
+    mean = 0.0
+    m2 = 0.0
+    # Length of the current run of equal non-NaN values ending at a[i - 1]
+    run = 0
+    last = 0.0
+    for i in range(a.shape[0]):
+        if i > window:
+            x = a[i - 1 - window]
+            if not math.isnan(x):
+                if n == 1:
+                    n = 0
+                    mean = 0.0
+                    m2 = 0.0
+                else:
+                    n -= 1
+                    delta = x - mean
+                    mean -= delta / n
+                    m2 -= delta * (x - mean)
+        if i >= 1:
+            x = a[i - 1]
+            if not math.isnan(x):
+                n += 1
+                delta = x - mean
+                mean += delta / n
+                m2 += delta * (x - mean)
+                run = run + 1 if run > 0 and x == last else 1
+                last = x
+        if n < min_periods or n < 2:
+            out[i] = np.nan
+            continue
+        if run >= n:
+            out[i] = (a[i] - last) / 0.0
+            continue
+        out[i] = (a[i] - mean) / math.sqrt(max(m2 / (n - 1), 0.0))
+
+
+@njit(cache=True, parallel=True, nogil=True)
+def _zscore_2d(a, window, min_periods, out):
+    """Apply `_zscore_1d` to every column of `a` in parallel."""
+    for j in prange(a.shape[1]):
+        _zscore_1d(a[:, j], window, min_periods, out[:, j])
+
+
+def rolling_zscore_past(
+    a: np.ndarray, window: int, min_periods: int, parallel: bool = True
+) -> np.ndarray:
+    """Past-only rolling z-scores for each column of a 2-D float array.
+
+    The output has the dtype of `a` (float32 or float64).
+    """
+    a = np.asfortranarray(a)
+    out = np.empty_like(a)
+    if parallel:
+        _zscore_2d(a, window, min_periods, out)
+    else:
+        for j in range(a.shape[1]):
+            _zscore_1d(a[:, j], window, min_periods, out[:, j])
+    return out
+
+
+@njit(cache=True, nogil=True)
+def _rolling_max_past(a, window, out):
+    """Max of ``a[i - window:i]`` (NaNs skipped) written into ``out[i]``.
+
+    Amortized O(N): the deque holds indices whose values decrease from head
+    to tail, so the head is always the current window's max.
+    """
+    dq = np.empty(a.shape[0], dtype=np.int64)
+    head = 0
+    tail = 0
+    for i in range(a.shape[0]):
+        if i >= 1:
+            prev = a[i - 1]
+            if not math.isnan(prev):
+                while tail > head and a[dq[tail - 1]] <= prev:
+                    tail -= 1
+                dq[tail] = i - 1
+                tail += 1
+        while head < tail and dq[head] < i - window:
+            head += 1
+        out[i] = a[dq[head]] if head < tail else np.nan
+
+
+def rolling_max_past(a: np.ndarray, window: int) -> np.ndarray:
+    """Past-only rolling max of a 1-D array (``shift(1).rolling(window, 1).max()``)."""
+    out = np.empty_like(a)
+    _rolling_max_past(a, window, out)
+    return out
+
+
+@njit(cache=True, nogil=True)
+def _cum_and_dd(r, window, out_cum, out_dd):
+    """Cumulative sum of `r` and its drawdown from the past `window` maximum.
+
+    One pass: the rolling max over ``out_cum[i - window:i]`` is kept in a
+    monotonic deque of indices whose values decrease from head to tail.
+    NaN returns leave a NaN in `out_cum` and do not enter the deque.
+    """
+    dq = np.empty(r.shape[0], dtype=np.int64)
+    head = 0
+    tail = 0
+    csum = 0.0
+    for i in range(r.shape[0]):
+        if i >= 1:
+            prev = out_cum[i - 1]
+            if not math.isnan(prev):
+                while tail > head and out_cum[dq[tail - 1]] <= prev:
+                    tail -= 1
+                dq[tail] = i - 1
+                tail += 1
+        while head < tail and dq[head] < i - window:
+            head += 1
+        x = r[i]
+        if math.isnan(x):
+            out_cum[i] = np.nan
+        else:
+            csum += x
+            out_cum[i] = csum
+        if head == tail:
+            out_dd[i] = np.nan
+        else:
+            out_dd[i] = out_cum[i] - out_cum[dq[head]]
+
+
+def cum_and_drawdown_past(r: np.ndarray, window: int) -> tuple[np.ndarray, np.ndarray]:
+    """Cumulative sum of a 1-D return array and its past-only rolling drawdown."""
+    out_cum = np.empty_like(r)
+    out_dd = np.empty_like(r)
+    _cum_and_dd(r, window, out_cum, out_dd)
+    return out_cum, out_dd
+
+
+def check_periods(periods: list[int]) -> None:
+    """Raise if any diff period is not a positive integer."""
+    # Slice subtraction only implements backward diffs (period >= 1)
+    bad = [p for p in periods if not isinstance(p, (int, np.integer)) or p < 1]
+    if bad:
+        raise ValueError(f"Diff periods must be positive integers, got {bad}")
+
+
+def diffs_past(values: np.ndarray, periods: list[int]) -> np.ndarray:
+    """All period diffs of a (N, C) array as (N, C * P), column then period."""
+    n, c = values.shape
+    # (N, C, P) so that the flattened output keeps the col-then-period order
+    out = np.empty((n, c, len(periods)), dtype=values.dtype)
+    for k, period in enumerate(periods):
+        out[:period, :, k] = np.nan
+        out[period:, :, k] = values[period:] - values[:-period]
+    return out.reshape(n, -1)
+
+
+def _warmup() -> None:
+    """Compile kernels on import so the first CLI call pays no JIT latency."""
+    for dtype in (np.float32, np.float64):
+        dummy = np.zeros((4, 2), dtype=dtype, order="F")
+        rolling_zscore_past(dummy, 2, 1, parallel=True)
+        rolling_zscore_past(dummy, 2, 1, parallel=False)
+        cum_and_drawdown_past(dummy[:, 0].copy(), 2)
+        rolling_max_past(dummy[:, 0].copy(), 2)
+
+
+_warmup()
@@ -0,0 +1,147 @@
+"""Array-backed feature frame for the compiled recipes.
+
+`FeatureMatrix` converts the numeric columns of the input DataFrame to NumPy
+once, lets every step read and append columns as arrays, and converts back to
+a DataFrame once at the end. The `_fm_*` step functions below mirror the
+DataFrame ones in `macrostate.features.transformers` and produce the same
+columns.
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from joblib import Memory
+
+from macrostate.features._kernels import check_periods, cum_and_drawdown_past, diffs_past
+from macrostate.features.transformers import zscore_values
+
+
+class FeatureMatrix:
+    """Named float columns stored as column-major (N, k) array blocks.
+
+    New columns are appended as whole blocks and only concatenated into a
+    single buffer in `to_df`. Non-numeric input columns (dates, labels) are
+    kept aside untouched and put back in their original position by `to_df`.
+    """
+
+    def __init__(
+        self,
+        names: list[str],
+        data: np.ndarray,
+        index: pd.Index,
+        passthrough: pd.DataFrame | None = None,
+        input_columns: list[str] | None = None,
+    ):
+        self.index = index
+        self.dtype = data.dtype
+        self.names: list[str] = []
+        self._blocks: list[np.ndarray] = []
+        self._where: dict[str, tuple[int, int]] = {}
+        self._passthrough = passthrough
+        self._input_columns = input_columns
+        self.append(data, names)
+
+    @classmethod
+    def from_df(cls, df: pd.DataFrame, dtype: str = "float64") -> "FeatureMatrix":
+        # Same columns as `_copy_as` casts in the sklearn pipeline
+        numeric = df.select_dtypes("number").columns
+        passthrough = None
+        if len(numeric) < df.shape[1]:
+            passthrough = df.drop(columns=numeric)
+        # np.array copies, so in-place steps never write into `df`
+        data = np.array(df[numeric].to_numpy(dtype=dtype), order="F")
+        return cls(numeric.tolist(), data, df.index, passthrough, df.columns.tolist())
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._where
+
+    def column(self, name: str) -> np.ndarray:
+        """Contiguous, writable view of one column."""
+        block, j = self._where[name]
+        return self._blocks[block][:, j]
+
+    def take(self, names: list[str]) -> np.ndarray:
+        """Copy of several columns as a column-major (N, len(names)) array."""
+        out = np.empty((len(self.index), len(names)), dtype=self.dtype, order="F")
+        for j, name in enumerate(names):
+            out[:, j] = self.column(name)
+        return out
+
+    def append(self, block: np.ndarray, names: list[str]) -> None:
+        """Append a (N, len(names)) block of columns.
+
+        Names that already exist are overwritten in place, as `_append_block`
+        does for DataFrames.
+        """
+        block = np.asfortranarray(block, dtype=self.dtype)
+        existing = [j for j, name in enumerate(names) if name in self._where]
+        if existing:
+            for j in existing:
+                self.column(names[j])[:] = block[:, j]
+            new = [j for j in range(len(names)) if j not in existing]
+            if not new:
+                return
+            block = np.asfortranarray(block[:, new])
+            names = [names[j] for j in new]
+        for j, name in enumerate(names):
+            self._where[name] = (len(self._blocks), j)
+        self._blocks.append(block)
+        self.names.extend(names)
+
+    def to_df(self) -> pd.DataFrame:
+        data = np.concatenate(self._blocks, axis=1)
+        df = pd.DataFrame(data, index=self.index, columns=self.names, copy=False)
+        if self._passthrough is None:
+            return df
+        # Input columns keep their order, new feature columns follow
+        n_input = len(self._input_columns) - self._passthrough.shape[1]
+        order = self._input_columns + self.names[n_input:]
+        return pd.concat([df, self._passthrough], axis=1)[order]
+
+
+def _fm_yc_slope(
+    fm: FeatureMatrix, long_rate: str = "US10Y", short_rate: str = "US2Y"
+) -> None:
+    slope = fm.column(long_rate) - fm.column(short_rate)
+    fm.append(slope[:, None], ["YC_SLOPE"])
+
+
+def _fm_cum_drawdown(
+    fm: FeatureMatrix, ret_col: str, window: int, cum_col: str, output_col: str
+) -> None:
+    cum, drawdown = cum_and_drawdown_past(fm.column(ret_col), window)
+    fm.append(np.column_stack((cum, drawdown)), [cum_col, output_col])
+
+
+def _fm_diffs(fm: FeatureMatrix, columns: list[str], periods: list[int]) -> None:
+    check_periods(periods)
+    columns = [c for c in columns if c in fm]
+    if not columns:
+        return
+    names = [f"{col}_D{period}M" for col in columns for period in periods]
+    fm.append(diffs_past(fm.take(columns), periods), names)
+
+
+def _fm_zscore(
+    fm: FeatureMatrix,
+    columns: list[str],
+    window: int,
+    min_periods: int,
+    suffix: str = "_Z",
+    parallel: bool = True,
+    memory: str | Path | Memory | None = None,
+) -> None:
+    columns = [c for c in columns if c in fm]
+    if not columns:
+        return
+    out = zscore_values(
+        fm.take(columns), fm.index, columns, window, min_periods, str(fm.dtype), parallel, memory
+    )
+    fm.append(out, [f"{col}{suffix}" for col in columns])
+
+
+def _fm_flip_signs(fm: FeatureMatrix, columns: list[str]) -> None:
+    for col in columns:
+        if col in fm:
+            values = fm.column(col)
+            np.negative(values, out=values)
@@ -1,12 +1,181 @@
+import hashlib
+import re
+from functools import lru_cache
+from pathlib import Path
 from typing import Self
 
 import numpy as np
 import pandas as pd
+from joblib import Memory
 from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.utils.validation import check_memory
+
+from macrostate.features import _kernels
+from macrostate.features._kernels import (
+    check_periods,
+    cum_and_drawdown_past,
+    diffs_past,
+    rolling_max_past,
+    rolling_zscore_past,
+)
+
+
+# Step functions shared by the transformers below and by the compiled
+# recipes in `macrostate.pipelines.preprocess`. They may mutate `X` or return
+# a new frame, so callers must always use the returned frame.
+
+
+def _copy_as(X: pd.DataFrame, dtype: str | None = None) -> pd.DataFrame:
+    if dtype is None:
+        return X.copy()
+    numeric = X.select_dtypes("number").columns
+    return X.astype(dict.fromkeys(numeric, dtype))
+
+
+def _append_block(X: pd.DataFrame, values: np.ndarray, names: list[str]) -> pd.DataFrame:
+    """Append new columns in one concat instead of one insertion per column."""
+    if X.columns.isin(names).any():
+        X[names] = values
+        return X
+    block = pd.DataFrame(values, index=X.index, columns=names, copy=False)
+    return pd.concat([X, block], axis=1)
+
+
+def _apply_yc_slope(
+    X: pd.DataFrame, long_rate: str = "US10Y", short_rate: str = "US2Y"
+) -> pd.DataFrame:
+    X["YC_SLOPE"] = X[long_rate].to_numpy() - X[short_rate].to_numpy()
+    return X
+
+
+def _apply_cum_ret(X: pd.DataFrame, ret_col: str, output_col: str) -> pd.DataFrame:
+    # Cumsum of log returns = log(cumulative price ratio)
+    cum = X[ret_col].cumsum().to_numpy()
+    return _append_block(X, cum[:, None], [output_col])
+
+
+def _apply_drawdown(X: pd.DataFrame, cum_col: str, window: int, output_col: str) -> pd.DataFrame:
+    cum = X[cum_col].to_numpy(dtype=np.float64)
+    # Past-only rolling max (rows t-window .. t-1), then drawdown in log space
+    X[output_col] = cum - rolling_max_past(cum, window)
+    return X
+
+
+def _apply_cum_drawdown(
+    X: pd.DataFrame,
+    ret_col: str,
+    window: int,
+    cum_col: str,
+    output_col: str,
+    dtype: str = "float64",
+) -> pd.DataFrame:
+    # Single pass: cumulative log return and drawdown from its past-only max
+    cum, drawdown = cum_and_drawdown_past(X[ret_col].to_numpy(dtype=dtype), window)
+    return _append_block(X, np.column_stack((cum, drawdown)), [cum_col, output_col])
+
+
+def _apply_diffs_fused(
+    X: pd.DataFrame, columns: list[str], periods: list[int], dtype: str = "float64"
+) -> pd.DataFrame:
+    check_periods(periods)
+    columns = [c for c in columns if c in X.columns]
+    if not columns:
+        return X
+    values = X[columns].to_numpy(dtype=dtype, copy=False)
+    names = [f"{col}_D{period}M" for col in columns for period in periods]
+    return _append_block(X, diffs_past(values, periods), names)
+
+
+def _zscore_block(
+    digest: str,
+    columns: list[str],
+    values: np.ndarray,
+    window: int,
+    min_periods: int,
+    dtype: str,
+    parallel: bool,
+) -> np.ndarray:
+    # `digest` and `columns` identify `values` for the joblib cache
+    return rolling_zscore_past(values, window, min_periods, parallel=parallel)
+
+
+def _apply_zscore_numba(
+    X: pd.DataFrame,
+    columns: list[str],
+    window: int,
+    min_periods: int,
+    suffix: str = "_Z",
+    parallel: bool = True,
+    dtype: str = "float64",
+    memory: str | Path | Memory | None = None,
+) -> pd.DataFrame:
+    columns = [c for c in columns if c in X.columns]
+    if not columns:
+        return X
+    values = X[columns].to_numpy(dtype=dtype, copy=False)
+    out = zscore_values(
+        values, X.index, columns, window, min_periods, dtype, parallel, memory
+    )
+    return _append_block(X, out, [f"{col}{suffix}" for col in columns])
+
+
+@lru_cache(maxsize=1)
+def _kernel_version() -> str:
+    """Package version plus a hash of the kernels' source, for cache keys.
+
+    joblib only hashes the source of the cached function itself, which
+    forwards to the kernels, so a kernel change would not invalidate it.
+    """
+    from macrostate import __version__
+
+    source = Path(_kernels.__file__).read_bytes()
+    return f"{__version__}:{hashlib.blake2b(source, digest_size=16).hexdigest()}"
+
+
+def zscore_values(
+    values: np.ndarray,
+    index: pd.Index,
+    columns: list[str],
+    window: int,
+    min_periods: int,
+    dtype: str,
+    parallel: bool,
+    memory: str | Path | Memory | None,
+) -> np.ndarray:
+    """Z-scores of a (N, C) array, optionally cached in `memory`."""
+    if memory is None:
+        compute, digest = _zscore_block, ""
+    else:
+        # Key the cache on a hash of the input columns only, so joblib does
+        # not have to hash the whole frame
+        if isinstance(memory, Path):
+            memory = str(memory)  # check_memory only accepts str or Memory
+        compute = check_memory(memory).cache(_zscore_block, ignore=["values", "parallel"])
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(_kernel_version().encode())
+        hasher.update(pd.util.hash_pandas_object(index).to_numpy().tobytes())
+        hasher.update(np.ascontiguousarray(values).tobytes())
+        digest = hasher.hexdigest()
+    # CRITICAL: the kernel only uses rows before t to avoid leakage
+    return compute(digest, columns, values, window, min_periods, dtype, parallel)
+
+
+def _flip_signs(X: pd.DataFrame, columns: list[str]) -> pd.DataFrame:
+    existing = [c for c in columns if c in X.columns]
+    if existing:
+        # One negation pass over the column block and a single block insertion
+        X[existing] = np.negative(X[existing].to_numpy())
+    return X
 
 
 class PandasTransformer(BaseEstimator, TransformerMixin):
-    """Base transformer that works with pandas DataFrames."""
+    """Base transformer that works with pandas DataFrames.
+
+    Transformers may mutate `X` in place, and steps that add several columns
+    return a new frame built with a single concat, so always use the return
+    value. Pipelines start with `CopyOnceTransformer` so the caller's frame
+    is copied exactly once.
+    """
 
     def fit(self, X: pd.DataFrame, y=None) -> Self:
         return self
@@ -15,6 +184,19 @@ class PandasTransformer(BaseEstimator, TransformerMixin):
         raise NotImplementedError
 
 
+class CopyOnceTransformer(PandasTransformer):
+    """Take the single defensive copy of the input at pipeline entry.
+
+    If `dtype` is given, numeric columns are cast to it as part of the copy.
+    """
+
+    def __init__(self, dtype: str | None = None):
+        self.dtype = dtype
+
+    def transform(self, X: pd.DataFrame) -> pd.DataFrame:
+        return _copy_as(X, self.dtype)
+
+
 class YieldCurveSlopeTransformer(PandasTransformer):
     """Create yield curve slope: YC_SLOPE = US10Y - US2Y."""
 
@@ -23,16 +205,14 @@ class YieldCurveSlopeTransformer(PandasTransformer):
         self.short_rate = short_rate
 
     def transform(self, X: pd.DataFrame) -> pd.DataFrame:
-        X = X.copy()
-        X["YC_SLOPE"] = X[self.long_rate] - X[self.short_rate]
-        return X
+        return _apply_yc_slope(X, self.long_rate, self.short_rate)
 
 
 class DrawdownTransformer(PandasTransformer):
     """Compute drawdown from rolling max (past-only to avoid leakage).
     
     For use when price data is available. Computes: price / rolling_max - 1
-    Uses shift(1) to ensure only past data is used.
+    The rolling max excludes the current row, so only past data is used.
     """
 
     def __init__(self, price_col: str, window: int = 12, output_col: str | None = None):
@@ -41,35 +221,41 @@ class DrawdownTransformer(PandasTransformer):
         self.output_col = output_col or f"{price_col}_DD_{window}M"
 
     def transform(self, X: pd.DataFrame) -> pd.DataFrame:
-        X = X.copy()
-        # shift(1) ensures we use only past data (up to t-1)
-        rolling_max = X[self.price_col].shift(1).rolling(window=self.window, min_periods=1).max()
-        X[self.output_col] = X[self.price_col] / rolling_max - 1
+        price = X[self.price_col].to_numpy(dtype=np.float64)
+        # Rolling max over rows t-window .. t-1 only (past data)
+        X[self.output_col] = price / rolling_max_past(price, self.window) - 1
         return X
 
 
 class DiffTransformer(PandasTransformer):
-    """Compute differences (momentum) for specified columns."""
+    """Compute differences (momentum) for specified columns.
 
-    def __init__(self, columns: list[str], periods: list[int] | None = None):
+    All (column, period) diffs are computed from a single `dtype` array of
+    the selected columns. Periods must be positive.
+    """
+
+    def __init__(
+        self, columns: list[str], periods: list[int] | None = None, dtype: str = "float64"
+    ):
         self.columns = columns
         self.periods = periods or [1, 6]
+        self.dtype = dtype
 
     def transform(self, X: pd.DataFrame) -> pd.DataFrame:
-        X = X.copy()
-        for col in self.columns:
-            if col not in X.columns:
-                continue
-            for period in self.periods:
-                X[f"{col}_D{period}M"] = X[col].diff(period)
-        return X
+        return _apply_diffs_fused(X, self.columns, self.periods, self.dtype)
 
 
 class RollingZScoreTransformer(PandasTransformer):
     """Compute rolling z-scores using past-only data (no leakage).
     
-    Critical: Uses shift(1) before computing rolling mean/std to ensure
-    the z-score at time t only uses data from t-1 and earlier.
+    Critical: Rolling mean/std are computed over rows strictly before t
+    (equivalent to shift(1) then rolling), so the z-score at time t only
+    uses data from t-1 and earlier.
+
+    `engine_kwargs` mirrors pandas' numba engine option; only ``parallel``
+    (default True) is honoured, to run columns concurrently. The kernel runs
+    in `dtype` (float32 or float64). If `memory` is set (a cache directory
+    or ``joblib.Memory``), results are cached on a hash of the input columns.
     """
 
     def __init__(
@@ -78,24 +264,30 @@ class RollingZScoreTransformer(PandasTransformer):
         window: int = 60,
         min_periods: int = 24,
         suffix: str = "_Z",
+        engine_kwargs: dict[str, bool] | None = None,
+        dtype: str = "float64",
+        memory: str | Path | Memory | None = None,
     ):
         self.columns = columns
         self.window = window
         self.min_periods = min_periods
         self.suffix = suffix
+        self.engine_kwargs = engine_kwargs
+        self.dtype = dtype
+        self.memory = memory
 
     def transform(self, X: pd.DataFrame) -> pd.DataFrame:
-        X = X.copy()
-        for col in self.columns:
-            if col not in X.columns:
-                continue
-            # CRITICAL: shift(1) to avoid leakage - only use past data
-            shifted = X[col].shift(1)
-            rolling_mean = shifted.rolling(window=self.window, min_periods=self.min_periods).mean()
-            rolling_std = shifted.rolling(window=self.window, min_periods=self.min_periods).std()
-            # Use current value minus past mean/std
-            X[f"{col}{self.suffix}"] = (X[col] - rolling_mean) / rolling_std
-        return X
+        parallel = (self.engine_kwargs or {}).get("parallel", True)
+        return _apply_zscore_numba(
+            X,
+            self.columns,
+            self.window,
+            self.min_periods,
+            self.suffix,
+            parallel,
+            self.dtype,
+            self.memory,
+        )
 
 
 class SignFlipTransformer(PandasTransformer):
@@ -105,11 +297,7 @@ class SignFlipTransformer(PandasTransformer):
         self.columns = columns
 
     def transform(self, X: pd.DataFrame) -> pd.DataFrame:
-        X = X.copy()
-        for col in self.columns:
-            if col in X.columns:
-                X[col] = -X[col]
-        return X
+        return _flip_signs(X, self.columns)
 
 
 class ColumnRenamer(PandasTransformer):
@@ -122,6 +310,11 @@ class ColumnRenamer(PandasTransformer):
         return X.rename(columns=self.mapping)
 
 
+@lru_cache(maxsize=32)
+def _compile_pattern(pattern: str) -> re.Pattern:
+    return re.compile(pattern)
+
+
 class ColumnSelector(PandasTransformer):
     """Select specific columns from DataFrame."""
 
@@ -134,7 +327,9 @@ class ColumnSelector(PandasTransformer):
             existing = [c for c in self.columns if c in X.columns]
             return X[existing]
         if self.pattern:
-            cols = X.filter(regex=self.pattern).columns.tolist()
+            # Compiled at transform time so set_params/clone see the current pattern
+            regex = _compile_pattern(self.pattern)
+            cols = [c for c in X.columns if regex.search(str(c))]
             return X[cols]
         return X
 
@@ -149,6 +344,35 @@ class DropNaTransformer(PandasTransformer):
         return X.dropna(subset=self.subset)
 
 
+def _drop_warmup(X: pd.DataFrame, n: int) -> pd.DataFrame:
+    """Positional slice of the `n` warm-up rows, or `dropna` if that differs.
+
+    The slice equals `dropna` when every head row has a NaN and no other row
+    does. Anything else (NaNs in the input, or steps that had no columns to
+    fill and so left no warm-up) falls back to `dropna`. Both checks are
+    boolean passes, much cheaper than the copy `dropna` makes.
+    """
+    sliced = X.iloc[n:]
+    head_has_nan = X.iloc[:n].isna().to_numpy().any(axis=1).all()
+    if not head_has_nan or sliced.isna().to_numpy().any():
+        return X.dropna()
+    return sliced
+
+
+class HeadSliceTransformer(PandasTransformer):
+    """Drop the first `n` rows (the known NaN warm-up of the feature steps).
+
+    A positional slice instead of `dropna`; falls back to `dropna` whenever
+    the slice would keep or drop different rows, so the result is the same.
+    """
+
+    def __init__(self, n: int):
+        self.n = n
+
+    def transform(self, X: pd.DataFrame) -> pd.DataFrame:
+        return _drop_warmup(X, self.n)
+
+
 class CumulativeReturnTransformer(PandasTransformer):
     """Compute cumulative returns from log returns for drawdown calculation."""
 
@@ -157,10 +381,7 @@ class CumulativeReturnTransformer(PandasTransformer):
         self.output_col = output_col
 
     def transform(self, X: pd.DataFrame) -> pd.DataFrame:
-        X = X.copy()
-        # Cumsum of log returns = log(cumulative price ratio)
-        X[self.output_col] = X[self.ret_col].cumsum()
-        return X
+        return _apply_cum_ret(X, self.ret_col, self.output_col)
 
 
 class DrawdownFromCumRetTransformer(PandasTransformer):
@@ -172,11 +393,31 @@ class DrawdownFromCumRetTransformer(PandasTransformer):
         self.output_col = output_col
 
     def transform(self, X: pd.DataFrame) -> pd.DataFrame:
-        X = X.copy()
-        # shift(1) for past-only, then rolling max
-        shifted = X[self.cum_col].shift(1)
-        rolling_max = shifted.rolling(window=self.window, min_periods=1).max()
-        # Drawdown in log space
-        X[self.output_col] = X[self.cum_col] - rolling_max
-        return X
+        return _apply_drawdown(X, self.cum_col, self.window, self.output_col)
+
 
+class SpxCumDrawdownTransformer(PandasTransformer):
+    """Cumulative log returns and their drawdown (past-only) in one pass.
+
+    Produces the same columns as `CumulativeReturnTransformer` followed by
+    `DrawdownFromCumRetTransformer`, without the intermediate passes.
+    """
+
+    def __init__(
+        self,
+        ret_col: str = "SPX_RET_1M",
+        window: int = 12,
+        cum_col: str = "SPX_CUM",
+        output_col: str = "SPX_DD_12M",
+        dtype: str = "float64",
+    ):
+        self.ret_col = ret_col
+        self.window = window
+        self.cum_col = cum_col
+        self.output_col = output_col
+        self.dtype = dtype
+
+    def transform(self, X: pd.DataFrame) -> pd.DataFrame:
+        return _apply_cum_drawdown(
+            X, self.ret_col, self.window, self.cum_col, self.output_col, self.dtype
+        )
@@ -1,20 +1,41 @@
+from collections.abc import Callable
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+from joblib import Memory
+from sklearn.base import clone
 from sklearn.pipeline import Pipeline
 
 from macrostate.config.settings import PreprocessConfig, RecipeType
+from macrostate.features.matrix import (
+    FeatureMatrix,
+    _fm_cum_drawdown,
+    _fm_diffs,
+    _fm_flip_signs,
+    _fm_yc_slope,
+    _fm_zscore,
+)
 from macrostate.features.transformers import (
+    CopyOnceTransformer,
     YieldCurveSlopeTransformer,
     DiffTransformer,
     RollingZScoreTransformer,
     SignFlipTransformer,
     DropNaTransformer,
-    CumulativeReturnTransformer,
-    DrawdownFromCumRetTransformer,
+    HeadSliceTransformer,
+    SpxCumDrawdownTransformer,
+    _drop_warmup,
 )
+from macrostate.recipes import AVAILABLE_RECIPES
 
-AVAILABLE_RECIPES = ["baseline_z", "z_plus_momentum", "changes_only", "levels_only"]
 
-
-def build_preprocessing_pipeline(recipe: RecipeType, cfg: PreprocessConfig) -> Pipeline:
+def build_preprocessing_pipeline(
+    recipe: RecipeType,
+    cfg: PreprocessConfig,
+    legacy: bool = True,
+    memory: str | Path | Memory | None = None,
+) -> Pipeline | Callable[[pd.DataFrame], pd.DataFrame]:
     """Build a preprocessing pipeline based on recipe name.
     
     Recipes:
@@ -22,12 +43,36 @@ def build_preprocessing_pipeline(recipe: RecipeType, cfg: PreprocessConfig) -> P
     - z_plus_momentum: baseline_z + Δ1M/Δ6M + SPX drawdown
     - changes_only: only diffs/momentum, no level z-scores
     - levels_only: only level z-scores, no diffs
+
+    With ``legacy=True`` an sklearn ``Pipeline`` is returned (use
+    ``fit_transform``). With ``legacy=False`` the recipe is compiled into a
+    plain ``df -> df`` function that skips the sklearn machinery.
+
+    `memory` (a cache directory or ``joblib.Memory``) caches the z-score
+    step, keyed on a hash of its input columns.
+
+    Builds are cached per arguments. The compiled function holds no mutable
+    state and is shared; each ``Pipeline`` is a fresh ``clone`` of the cached
+    one, so ``set_params`` or fitting it does not leak into later calls.
     """
     if recipe not in AVAILABLE_RECIPES:
         raise ValueError(f"Unknown recipe '{recipe}'. Available: {AVAILABLE_RECIPES}")
 
+    if not legacy:
+        return _compile_recipe(recipe, cfg, memory)
+    return clone(_build_pipeline(recipe, cfg, memory))
+
+
+@lru_cache(maxsize=16)
+def _build_pipeline(
+    recipe: RecipeType, cfg: PreprocessConfig, memory: str | Path | Memory | None
+) -> Pipeline:
+    """Cached template of the sklearn pipeline; only hand out clones of it."""
     steps: list[tuple[str, any]] = []
 
+    # Single copy of the input; later steps work in place
+    steps.append(("copy", CopyOnceTransformer(dtype=cfg.dtype)))
+
     # Common: add yield curve slope
     steps.append(("yc_slope", YieldCurveSlopeTransformer()))
 
@@ -43,10 +88,16 @@ def build_preprocessing_pipeline(recipe: RecipeType, cfg: PreprocessConfig) -> P
     elif recipe == "levels_only":
         steps.extend(_levels_only_steps(cfg))
 
-    # Always drop NaN at the end
-    steps.append(("drop_na", DropNaTransformer()))
+    # Always drop the NaN warm-up rows at the end
+    if cfg.safe_dropna:
+        steps.append(("drop_na", DropNaTransformer()))
+    else:
+        steps.append(("drop_warmup", HeadSliceTransformer(n=_warmup_rows(recipe, cfg))))
 
-    return Pipeline(steps)
+    pipeline = Pipeline(steps)
+    if memory is not None and "zscore" in pipeline.named_steps:
+        pipeline.set_params(zscore__memory=memory)
+    return pipeline
 
 
 def _baseline_z_steps(cfg: PreprocessConfig) -> list[tuple[str, any]]:
@@ -58,6 +109,7 @@ def _baseline_z_steps(cfg: PreprocessConfig) -> list[tuple[str, any]]:
                 columns=cfg.zscore_columns,
                 window=cfg.zscore_window,
                 min_periods=cfg.zscore_min_periods,
+                dtype=cfg.dtype,
             ),
         ),
         ("sign_flip", SignFlipTransformer(columns=cfg.sign_flip_columns)),
@@ -67,12 +119,13 @@ def _baseline_z_steps(cfg: PreprocessConfig) -> list[tuple[str, any]]:
 def _z_plus_momentum_steps(cfg: PreprocessConfig) -> list[tuple[str, any]]:
     """Z-scores + momentum (diffs) + SPX drawdown."""
     return [
-        # Cumulative returns for drawdown calculation
-        ("cum_ret", CumulativeReturnTransformer(ret_col="SPX_RET_1M")),
-        # Drawdown from cumulative returns
-        ("drawdown", DrawdownFromCumRetTransformer(cum_col="SPX_CUM", window=12)),
+        # Cumulative returns and drawdown from them, in one pass
+        (
+            "cum_drawdown",
+            SpxCumDrawdownTransformer(ret_col="SPX_RET_1M", window=12, dtype=cfg.dtype),
+        ),
         # Diffs (momentum)
-        ("diff", DiffTransformer(columns=cfg.diff_columns, periods=[1, 6])),
+        ("diff", DiffTransformer(columns=cfg.diff_columns, periods=cfg.diff_periods, dtype=cfg.dtype)),
         # Z-scores
         (
             "zscore",
@@ -80,6 +133,7 @@ def _z_plus_momentum_steps(cfg: PreprocessConfig) -> list[tuple[str, any]]:
                 columns=cfg.zscore_columns,
                 window=cfg.zscore_window,
                 min_periods=cfg.zscore_min_periods,
+                dtype=cfg.dtype,
             ),
         ),
         ("sign_flip", SignFlipTransformer(columns=cfg.sign_flip_columns)),
@@ -89,9 +143,11 @@ def _z_plus_momentum_steps(cfg: PreprocessConfig) -> list[tuple[str, any]]:
 def _changes_only_steps(cfg: PreprocessConfig) -> list[tuple[str, any]]:
     """Only diffs/momentum, no level z-scores."""
     return [
-        ("cum_ret", CumulativeReturnTransformer(ret_col="SPX_RET_1M")),
-        ("drawdown", DrawdownFromCumRetTransformer(cum_col="SPX_CUM", window=12)),
-        ("diff", DiffTransformer(columns=cfg.diff_columns, periods=[1, 6])),
+        (
+            "cum_drawdown",
+            SpxCumDrawdownTransformer(ret_col="SPX_RET_1M", window=12, dtype=cfg.dtype),
+        ),
+        ("diff", DiffTransformer(columns=cfg.diff_columns, periods=cfg.diff_periods, dtype=cfg.dtype)),
     ]
 
 
@@ -104,8 +160,89 @@ def _levels_only_steps(cfg: PreprocessConfig) -> list[tuple[str, any]]:
                 columns=cfg.zscore_columns,
                 window=cfg.zscore_window,
                 min_periods=cfg.zscore_min_periods,
+                dtype=cfg.dtype,
             ),
         ),
         ("sign_flip", SignFlipTransformer(columns=cfg.sign_flip_columns)),
     ]
 
+
+def _warmup_rows(recipe: RecipeType, cfg: PreprocessConfig) -> int:
+    """Number of leading rows left NaN by the recipe's steps on NaN-free input.
+
+    Only counts steps that have columns to work on; configured columns that
+    are missing from the frame are caught by the check in `_drop_warmup`.
+    """
+    rows = 0
+    if recipe in ("z_plus_momentum", "changes_only"):
+        # The SPX drawdown has no past max on the first row
+        rows = 1
+        if cfg.diff_columns and cfg.diff_periods:
+            rows = max(rows, *cfg.diff_periods)
+    if recipe in ("baseline_z", "z_plus_momentum", "levels_only") and cfg.zscore_columns:
+        # Past-only std needs min_periods (and at least 2) prior observations
+        rows = max(rows, cfg.zscore_min_periods, 2)
+    return rows
+
+
+@lru_cache(maxsize=16)
+def _compile_recipe(
+    recipe: RecipeType, cfg: PreprocessConfig, memory: str | Path | Memory | None = None
+) -> Callable[[pd.DataFrame], pd.DataFrame]:
+    """Specialize a recipe into a single function calling the step kernels directly.
+
+    The input is converted once to a `FeatureMatrix` in `cfg.dtype`, every
+    step works on its arrays, and a single DataFrame is built at the end.
+    Produces the same output as the sklearn pipeline for the same recipe.
+    """
+    zscore_columns = list(cfg.zscore_columns)
+    zscore_window = cfg.zscore_window
+    zscore_min_periods = cfg.zscore_min_periods
+    diff_columns = list(cfg.diff_columns)
+    diff_periods = list(cfg.diff_periods)
+    sign_flip_columns = list(cfg.sign_flip_columns)
+    dtype = cfg.dtype
+    warmup = _warmup_rows(recipe, cfg)
+    safe_dropna = cfg.safe_dropna
+
+    def to_features(fm: FeatureMatrix) -> pd.DataFrame:
+        df = fm.to_df()
+        return df.dropna() if safe_dropna else _drop_warmup(df, warmup)
+
+    if recipe in ("baseline_z", "levels_only"):
+
+        def run(df: pd.DataFrame) -> pd.DataFrame:
+            fm = FeatureMatrix.from_df(df, dtype)
+            _fm_yc_slope(fm)
+            _fm_zscore(
+                fm, zscore_columns, zscore_window, zscore_min_periods, memory=memory
+            )
+            _fm_flip_signs(fm, sign_flip_columns)
+            return to_features(fm)
+
+    elif recipe == "z_plus_momentum":
+
+        def run(df: pd.DataFrame) -> pd.DataFrame:
+            fm = FeatureMatrix.from_df(df, dtype)
+            _fm_yc_slope(fm)
+            _fm_cum_drawdown(fm, "SPX_RET_1M", 12, "SPX_CUM", "SPX_DD_12M")
+            _fm_diffs(fm, diff_columns, diff_periods)
+            _fm_zscore(
+                fm, zscore_columns, zscore_window, zscore_min_periods, memory=memory
+            )
+            _fm_flip_signs(fm, sign_flip_columns)
+            return to_features(fm)
+
+    elif recipe == "changes_only":
+
+        def run(df: pd.DataFrame) -> pd.DataFrame:
+            fm = FeatureMatrix.from_df(df, dtype)
+            _fm_yc_slope(fm)
+            _fm_cum_drawdown(fm, "SPX_RET_1M", 12, "SPX_CUM", "SPX_DD_12M")
+            _fm_diffs(fm, diff_columns, diff_periods)
+            return to_features(fm)
+
+    else:
+        raise ValueError(f"Unknown recipe '{recipe}'. Available: {AVAILABLE_RECIPES}")
+
+    return run
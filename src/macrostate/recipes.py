@@ -0,0 +1,3 @@
+"""Recipe names, kept free of heavy imports so the CLI can list them cheaply."""
+
+AVAILABLE_RECIPES = ["baseline_z", "z_plus_momentum", "changes_only", "levels_only"]
@@ -1,15 +1,24 @@
+import logging
 import sys
-from loguru import logger
 
+_FORMAT = "%(asctime)s | %(levelname)-8s | %(name)s - %(message)s"
 
-def get_logger(name: str = "macrostate") -> "logger":
-    """Get configured logger instance."""
-    logger.remove()
-    logger.add(
-        sys.stderr,
-        format="<green>{time:HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan> - {message}",
-        level="INFO",
-        colorize=True,
-    )
-    return logger.bind(name=name)
 
+def get_logger(name: str = "macrostate") -> logging.Logger:
+    """Get configured logger instance.
+
+    Logging is configured once, on first use. Pass arguments lazily
+    (``logger.info("Loaded %d rows", n)``) so skipped messages cost nothing.
+    """
+    root = logging.getLogger()
+    if not root.handlers:
+        if sys.stderr.isatty():
+            from rich.logging import RichHandler
+
+            handler = RichHandler(show_path=False, log_time_format="%H:%M:%S")
+            handler.setFormatter(logging.Formatter("%(name)s - %(message)s"))
+        else:
+            handler = logging.StreamHandler(sys.stderr)
+            handler.setFormatter(logging.Formatter(_FORMAT, datefmt="%H:%M:%S"))
+        logging.basicConfig(level=logging.INFO, handlers=[handler])
+    return logging.getLogger(name)
@@ -1,8 +1,10 @@
+from functools import lru_cache
 from pathlib import Path
 
 
+@lru_cache(maxsize=1)
 def get_project_root() -> Path:
-    """Get project root directory."""
+    """Get project root directory (cached: it only depends on this file's location)."""
     current = Path(__file__).resolve()
     for parent in current.parents:
         if (parent / "pyproject.toml").exists():
@@ -0,0 +1,84 @@
+"""Test the features cache key and the z-score step cache."""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import macrostate
+from macrostate import cli
+from macrostate.config.settings import PreprocessConfig
+from macrostate.features import transformers
+
+
+def test_features_cache_key_changes_with_inputs(tmp_path, monkeypatch):
+    """Input metadata, recipe and package version all invalidate the cache."""
+    raw = tmp_path / "raw.xlsx"
+    raw.write_bytes(b"data")
+    cfg = PreprocessConfig()
+
+    key = cli._features_cache_path(tmp_path, raw, "baseline_z", cfg)
+    assert cli._features_cache_path(tmp_path, raw, "baseline_z", cfg) == key
+    assert cli._features_cache_path(tmp_path, raw, "levels_only", cfg) != key
+
+    stat = raw.stat()
+    os.utime(raw, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    touched = cli._features_cache_path(tmp_path, raw, "baseline_z", cfg)
+    assert touched != key
+
+    monkeypatch.setattr(macrostate, "__version__", "999.0")
+    assert cli._features_cache_path(tmp_path, raw, "baseline_z", cfg) != touched
+
+
+def test_zscore_step_cache_hit_and_miss(tmp_path, monkeypatch):
+    """Same input columns hit the cache; changed values recompute."""
+    calls = []
+    kernel = transformers.rolling_zscore_past
+
+    def counting_kernel(*args, **kwargs):
+        calls.append(1)
+        return kernel(*args, **kwargs)
+
+    monkeypatch.setattr(transformers, "rolling_zscore_past", counting_kernel)
+
+    rng = np.random.default_rng(0)
+    index = pd.date_range("2000-01-01", periods=80, freq="ME")
+    values = np.asfortranarray(rng.normal(size=(80, 2)))
+    args = (["a", "b"], 12, 6, "float64", True)
+
+    first = transformers.zscore_values(values, index, *args, memory=tmp_path)
+    second = transformers.zscore_values(values.copy(), index, *args, memory=tmp_path)
+    assert len(calls) == 1
+    np.testing.assert_array_equal(first, second)
+
+    changed = values.copy()
+    changed[-1, 0] += 1.0
+    transformers.zscore_values(changed, index, *args, memory=tmp_path)
+    assert len(calls) == 2
+
+    # A kernel change invalidates entries for unchanged data
+    monkeypatch.setattr(transformers, "_kernel_version", lambda: "changed")
+    transformers.zscore_values(values, index, *args, memory=tmp_path)
+    assert len(calls) == 3
+
+
+@pytest.mark.parametrize("freq", ["ME", None])
+def test_features_cache_round_trip(tmp_path, freq):
+    """Features read from the cache equal the ones that were computed."""
+    from macrostate.pipelines.preprocess import build_preprocessing_pipeline
+
+    rng = np.random.default_rng(0)
+    index = pd.date_range("1994-01-31", periods=90, freq="ME", name="Date")
+    index = pd.DatetimeIndex(index, freq=freq)
+    columns = ["US10Y", "US2Y", "HY_OAS", "VIX", "SPX_RET_1M"]
+    clean = pd.DataFrame(rng.normal(size=(90, len(columns))), index=index, columns=columns)
+    computed = build_preprocessing_pipeline(
+        "z_plus_momentum", PreprocessConfig(), legacy=False
+    )(clean)
+
+    cache_path = tmp_path / "cache" / "features.parquet"
+    cli._save_cached_features(computed, cache_path)
+    cached = cli._load_cached_features(cache_path)
+
+    pd.testing.assert_frame_equal(cached, computed)
@@ -0,0 +1,33 @@
+"""Test DiffTransformer against pandas Series.diff."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from macrostate.features.transformers import DiffTransformer
+
+
+@pytest.mark.parametrize("periods", [[1], [1, 6], [3, 12], [50]])
+def test_diff_matches_pandas(periods):
+    """Each output column equals Series.diff(period), including NaN inputs."""
+    rng = np.random.default_rng(3)
+    dates = pd.date_range("2000-01-01", periods=40, freq="ME")
+    df = pd.DataFrame(rng.normal(size=(40, 2)), index=dates, columns=["a", "b"])
+    df.iloc[[4, 20], 0] = np.nan
+
+    result = DiffTransformer(columns=["a", "b", "missing"], periods=periods).transform(df.copy())
+
+    for col in ["a", "b"]:
+        for period in periods:
+            pd.testing.assert_series_equal(
+                result[f"{col}_D{period}M"], df[col].diff(period), check_names=False
+            )
+    assert "missing_D1M" not in result.columns
+
+
+@pytest.mark.parametrize("periods", [[0], [-1], [1, -6]])
+def test_diff_rejects_non_positive_periods(periods):
+    """Zero or negative periods would silently give wrong values."""
+    df = pd.DataFrame({"a": [1.0, 2.0, 4.0]})
+    with pytest.raises(ValueError, match="positive"):
+        DiffTransformer(columns=["a"], periods=periods).transform(df)
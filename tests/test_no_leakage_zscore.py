@@ -84,3 +84,94 @@ def test_drawdown_uses_past_only():
     # Drawdown at first row should be NaN (no past data)
     assert pd.isna(df["SPX_DD_12M"].iloc[0])
 
+
+@pytest.mark.parametrize("window", [1, 3, 12])
+def test_rolling_max_past_matches_pandas_with_nans(window):
+    """Deque kernel and DrawdownTransformer match shift(1).rolling().max()."""
+    from macrostate.features._kernels import rolling_max_past
+    from macrostate.features.transformers import DrawdownTransformer
+
+    rng = np.random.default_rng(1)
+    price = 100 + rng.normal(size=60).cumsum()
+    price[[0, 5, 6, 7, 30]] = np.nan
+    dates = pd.date_range("2000-01-01", periods=60, freq="ME")
+    df = pd.DataFrame({"PX": price}, index=dates)
+
+    expected_max = df["PX"].shift(1).rolling(window, min_periods=1).max()
+    np.testing.assert_array_equal(rolling_max_past(price, window), expected_max.to_numpy())
+
+    result = DrawdownTransformer(price_col="PX", window=window).transform(df.copy())
+    pd.testing.assert_series_equal(
+        result[f"PX_DD_{window}M"], df["PX"] / expected_max - 1, check_names=False
+    )
+
+
+@pytest.mark.parametrize("constant_run", [False, True])
+def test_zscore_matches_pandas_shifted_rolling(constant_run):
+    """Running-sum kernel should match shift(1).rolling().mean()/std().
+
+    Windows of equal values have exactly zero std, so an unchanged value
+    gives NaN (not a spurious +/-inf from rounding residue).
+    """
+    rng = np.random.default_rng(0)
+    values = rng.normal(3.0, 1.5, size=200)
+    values[[10, 50, 51, 120]] = np.nan
+    if constant_run:
+        values = np.concatenate([values[:100], np.full(80, 1.7), values[100:]])
+    dates = pd.date_range("2000-01-01", periods=len(values), freq="ME")
+    df = pd.DataFrame({"value": values}, index=dates)
+
+    transformer = RollingZScoreTransformer(
+        columns=["value"], window=60, min_periods=24, suffix="_Z"
+    )
+    result = transformer.transform(df)
+
+    shifted = df["value"].shift(1)
+    mean = shifted.rolling(window=60, min_periods=24).mean()
+    std = shifted.rolling(window=60, min_periods=24).std()
+    expected = (df["value"] - mean) / std
+
+    if constant_run:
+        assert result["value_Z"].iloc[160:180].isna().all()
+    pd.testing.assert_series_equal(
+        result["value_Z"], expected, check_names=False, rtol=1e-9
+    )
+
+
+def test_zscore_float32_matches_float64():
+    """float32 kernel should stay close to the float64 result."""
+    rng = np.random.default_rng(1)
+    dates = pd.date_range("1990-01-01", periods=400, freq="ME")
+    df = pd.DataFrame({"value": 1000.0 + rng.normal(0.0, 0.5, size=400)}, index=dates)
+
+    kwargs = dict(columns=["value"], window=60, min_periods=24, suffix="_Z")
+    result64 = RollingZScoreTransformer(**kwargs).transform(df.copy())
+    result32 = RollingZScoreTransformer(**kwargs, dtype="float32").transform(
+        df.astype("float32")
+    )
+
+    assert result32["value_Z"].dtype == np.float32
+    np.testing.assert_allclose(
+        result32["value_Z"].to_numpy(), result64["value_Z"].to_numpy(), atol=1e-3
+    )
+
+
+def test_fused_cum_drawdown_matches_two_steps():
+    """SpxCumDrawdownTransformer matches cumsum + shifted rolling max."""
+    from macrostate.features.transformers import (
+        CumulativeReturnTransformer,
+        DrawdownFromCumRetTransformer,
+        SpxCumDrawdownTransformer,
+    )
+
+    rng = np.random.default_rng(2)
+    returns = rng.normal(0.005, 0.04, size=120)
+    returns[[5, 30, 31]] = np.nan
+    dates = pd.date_range("2000-01-01", periods=120, freq="ME")
+    df = pd.DataFrame({"SPX_RET_1M": returns}, index=dates)
+
+    expected = CumulativeReturnTransformer(ret_col="SPX_RET_1M").transform(df.copy())
+    expected = DrawdownFromCumRetTransformer(cum_col="SPX_CUM", window=12).transform(expected)
+    result = SpxCumDrawdownTransformer(ret_col="SPX_RET_1M", window=12).transform(df.copy())
+
+    pd.testing.assert_frame_equal(result, expected)
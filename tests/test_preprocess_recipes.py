@@ -0,0 +1,139 @@
+"""Test that compiled recipes match the sklearn pipelines."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from macrostate.config.settings import PreprocessConfig
+from macrostate.pipelines.preprocess import AVAILABLE_RECIPES, build_preprocessing_pipeline
+
+
+@pytest.fixture
+def clean_df():
+    """Synthetic cleaned monthly frame with the renamed raw columns."""
+    rng = np.random.default_rng(42)
+    columns = [
+        "US10Y",
+        "US2Y",
+        "HY_OAS",
+        "IG_OAS",
+        "INFLATION_EXP",
+        "PMI_GAP",
+        "Unemployment",
+        "VIX",
+        "SPX_RET_1M",
+        "CREDIT_SPREAD",
+        "Confidence",
+    ]
+    dates = pd.date_range("1994-01-31", periods=150, freq="ME")
+    df = pd.DataFrame(
+        rng.normal(0.0, 0.1, size=(len(dates), len(columns))).cumsum(axis=0) + 3.0,
+        index=dates,
+        columns=columns,
+    )
+    df["SPX_RET_1M"] = rng.normal(0.005, 0.04, size=len(dates))
+    return df
+
+
+@pytest.mark.parametrize("existing_slope", [False, True])
+@pytest.mark.parametrize("recipe", AVAILABLE_RECIPES)
+def test_compiled_recipe_matches_pipeline(clean_df, recipe, existing_slope):
+    """legacy=False must produce the same features as the sklearn Pipeline."""
+    if existing_slope:
+        # A feature column already in the input is overwritten on both paths
+        clean_df.insert(2, "YC_SLOPE", 0.0)
+    cfg = PreprocessConfig()
+    expected = build_preprocessing_pipeline(recipe, cfg).fit_transform(clean_df)
+    result = build_preprocessing_pipeline(recipe, cfg, legacy=False)(clean_df)
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
+@pytest.mark.parametrize("legacy", [True, False])
+def test_pipeline_does_not_mutate_input(clean_df, legacy):
+    """The caller's frame is left untouched."""
+    original = clean_df.copy()
+    pipeline = build_preprocessing_pipeline("z_plus_momentum", PreprocessConfig(), legacy=legacy)
+    if legacy:
+        pipeline.fit_transform(clean_df)
+    else:
+        pipeline(clean_df)
+
+    pd.testing.assert_frame_equal(clean_df, original)
+
+
+@pytest.mark.parametrize("recipe", AVAILABLE_RECIPES)
+def test_warmup_slice_matches_dropna(clean_df, recipe):
+    """Slicing the warm-up rows drops exactly the rows dropna would."""
+    expected = build_preprocessing_pipeline(
+        recipe, PreprocessConfig(safe_dropna=True)
+    ).fit_transform(clean_df)
+    result = build_preprocessing_pipeline(recipe, PreprocessConfig()).fit_transform(clean_df)
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
+@pytest.mark.parametrize("legacy", [True, False])
+@pytest.mark.parametrize("recipe", AVAILABLE_RECIPES)
+def test_warmup_slice_falls_back_to_dropna_on_nan_input(clean_df, recipe, legacy):
+    """Input NaNs past the warm-up are dropped, as with safe_dropna=True."""
+    clean_df.iloc[[60, 61], clean_df.columns.get_loc("SPX_RET_1M")] = np.nan
+    clean_df.iloc[100, clean_df.columns.get_loc("VIX")] = np.nan
+
+    def run(cfg):
+        pipeline = build_preprocessing_pipeline(recipe, cfg, legacy=legacy)
+        return pipeline.fit_transform(clean_df) if legacy else pipeline(clean_df)
+
+    expected = run(PreprocessConfig(safe_dropna=True))
+    result = run(PreprocessConfig())
+
+    assert not result.isna().to_numpy().any()
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_legacy_pipelines_are_not_shared():
+    """Changing one returned Pipeline does not affect the next call's."""
+    cfg = PreprocessConfig()
+    first = build_preprocessing_pipeline("baseline_z", cfg)
+    first.set_params(zscore__window=3)
+    second = build_preprocessing_pipeline("baseline_z", cfg)
+
+    assert second is not first
+    assert second.named_steps["zscore"].window == cfg.zscore_window
+
+
+@pytest.mark.parametrize("recipe", AVAILABLE_RECIPES)
+def test_compiled_recipe_keeps_non_numeric_columns(clean_df, recipe):
+    """Date and label columns pass through unchanged and in place, as in legacy."""
+    clean_df.insert(0, "Date", clean_df.index)
+    clean_df.insert(5, "Regime", np.where(clean_df["VIX"] > 3.0, "risk_off", "risk_on"))
+    cfg = PreprocessConfig()
+    expected = build_preprocessing_pipeline(recipe, cfg).fit_transform(clean_df)
+    result = build_preprocessing_pipeline(recipe, cfg, legacy=False)(clean_df)
+
+    pd.testing.assert_frame_equal(result, expected)
+    assert result["Date"].dtype == clean_df["Date"].dtype
+
+
+@pytest.mark.parametrize("legacy", [True, False])
+@pytest.mark.parametrize(
+    ("recipe", "overrides"),
+    [
+        ("baseline_z", {"zscore_columns": ()}),
+        ("levels_only", {"zscore_columns": ("NOT_IN_FRAME",)}),
+        ("changes_only", {"diff_columns": ()}),
+        ("changes_only", {"diff_columns": ("NOT_IN_FRAME",)}),
+        ("z_plus_momentum", {"zscore_columns": (), "diff_columns": ()}),
+    ],
+)
+def test_warmup_slice_with_empty_or_missing_columns(clean_df, recipe, overrides, legacy):
+    """Steps with nothing to compute leave no warm-up rows to drop."""
+
+    def run(cfg):
+        pipeline = build_preprocessing_pipeline(recipe, cfg, legacy=legacy)
+        return pipeline.fit_transform(clean_df) if legacy else pipeline(clean_df)
+
+    expected = run(PreprocessConfig(safe_dropna=True, **overrides))
+    result = run(PreprocessConfig(**overrides))
+
+    pd.testing.assert_frame_equal(result, expected)